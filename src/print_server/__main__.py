@@ -1,9 +1,9 @@
 import argparse
 import json
 import logging
-import queue
 import signal
 import sys
+import threading
 from types import FrameType
 
 from .printer import Printer, PrintFailedError
@@ -32,6 +32,11 @@ def main() -> None:
     server_parser = subparsers.add_parser("server")
     server_parser.add_argument("--port", type=int, default=40121)
     server_parser.add_argument("--printer", type=str, help="Preferred printer name")
+    server_parser.add_argument(
+        "--printer-class",
+        type=str,
+        help="CUPS class to submit jobs to (cupsd handles failover)",
+    )
 
     # List Command
     subparsers.add_parser("list", help="List available printers")
@@ -55,33 +60,38 @@ def main() -> None:
             sys.exit(1)
 
     elif args.command == "server":
-        printer = Printer(preferred_printer=args.printer)
+        printer = Printer(
+            preferred_printer=args.printer, printer_class=args.printer_class
+        )
         # Pass the printer instance to the server
         server = LabelServer(("", args.port), printer)
 
-        shutdown_requested = False
+        shutdown_event = threading.Event()
 
-        # Signal handling for graceful shutdown
+        # Signal handling for graceful shutdown. The handler wakes the
+        # blocking get_job() call below so the loop exits immediately
+        # instead of polling the queue on a timeout.
         def signal_handler(sig: int, frame: FrameType | None) -> None:
-            nonlocal shutdown_requested
             logger.info("Received signal, initiating shutdown...")
-            shutdown_requested = True
+            shutdown_event.set()
+            server.wake()
 
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, signal_handler)
 
         server.start()
 
         logger.info("Server running. Waiting for jobs...")
         try:
-            while not shutdown_requested:
-                # This loop pulls jobs from the server queue and prints them
-                try:
-                    label = server.get_job(timeout=1.0)
-                except queue.Empty:
-                    continue
-
-                if label:
+            while not shutdown_event.is_set():
+                # Pull jobs from the server queue in batches: labels that
+                # queued up while the previous batch printed all come back
+                # from one blocking call.
+                labels = server.get_jobs()
+                for label in labels:
+                    if label is None:
+                        continue  # woken for shutdown
+
                     try:
                         printer.print_label(label)
                     except PrintFailedError as e:
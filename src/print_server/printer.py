@@ -1,22 +1,118 @@
+import asyncio
+import concurrent.futures
+import functools
+import io
 import logging
 import os
 import re
-import tempfile
+import threading
 import time
+from collections.abc import Callable
+from typing import Any, Concatenate, cast
 
 import cups
 import pyudev
-from PIL import Image
 
 from .renderer import render
 
 logger = logging.getLogger(__name__)
 
+# How long a printer enumeration stays valid without a USB hotplug event.
+_CACHE_TTL = 5.0
+
+# Fast jobs finish in tens of ms, so start polling quickly and back off
+# towards the caller-provided poll period for long-running jobs.
+_INITIAL_POLL_PERIOD = 0.005
+_POLL_BACKOFF = 1.6
+
+# Compiled once at import; these run on every enumeration / PPD parse.
+_USB_SUFFIX_RE = re.compile(r"_([0-9a-fA-F]{4}:[0-9a-fA-F]{4})$")
+_PPD_WH_RE = re.compile(r"w(\d+)h(\d+)")
+_PPD_CUSTOM_RE = re.compile(r"Custom\.(\d+\.?\d*)x(\d+\.?\d*)(in|mm|cm)?")
+
+
+_SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+
+
+def _connected_usb_ids(wanted: frozenset[str] | None = None) -> set[str]:
+    """
+    Read the ``VVVV:PPPP`` IDs of every device on the USB bus from sysfs.
+
+    This is what ``pyudev.Context.list_devices(subsystem="usb")`` boils down
+    to, minus the per-device ``Device`` wrappers and extra attribute reads —
+    we only need two files per device.
+
+    ``wanted`` is the set of IDs the caller cares about; once every wanted
+    ID has been seen the walk stops early instead of reading the rest of
+    the bus.
+    """
+    connected: set[str] = set()
+    try:
+        entries = list(os.scandir(_SYSFS_USB_DEVICES))
+    except OSError as e:
+        logger.error(f"Cannot scan {_SYSFS_USB_DEVICES}: {e}")
+        return connected
+
+    for entry in entries:
+        # Interface nodes ("1-2:1.0") never carry idVendor/idProduct;
+        # skip them up front instead of eating two failed opens each.
+        if ":" in entry.name:
+            continue
+        try:
+            with (
+                open(os.path.join(entry.path, "idVendor")) as vendor_file,
+                open(os.path.join(entry.path, "idProduct")) as product_file,
+            ):
+                vid = vendor_file.read().strip()
+                pid = product_file.read().strip()
+        except OSError:
+            # Hubs and other nodes without IDs land here.
+            continue
+        connected.add(f"{vid}:{pid}".lower())
+        if wanted is not None and wanted <= connected:
+            break
+
+    return connected
+
+
+def _usb_id_from_name(name: str) -> str | None:
+    """Extract the lowercased ``VVVV:PPPP`` suffix from a printer name."""
+    match = _USB_SUFFIX_RE.search(name)
+    if not match:
+        logger.debug(f"Printer '{name}' has no USB ID suffix")
+        return None
+    return match.group(1).lower()
+
 
 class PrintFailedError(Exception):
     pass
 
 
+def _with_reconnect[**P, R](
+    method: Callable[Concatenate["Printer", P], R],
+) -> Callable[Concatenate["Printer", P], R]:
+    """Retry a CUPS call once on a fresh connection after an ``IPPError``.
+
+    A cupsd restart breaks the persistent Unix-socket connection; rebuilding
+    it is much cheaper than recreating the whole ``Printer`` (udev context,
+    caches, worker pool).
+    """
+
+    @functools.wraps(method)
+    def wrapper(self: "Printer", *args: P.args, **kwargs: P.kwargs) -> R:
+        with self._lock:
+            try:
+                return method(self, *args, **kwargs)
+            except cups.IPPError as e:
+                logger.warning(f"IPPError from CUPS ({e}); reconnecting and retrying")
+                self._reconnect()
+                return method(self, *args, **kwargs)
+
+    # functools.wraps types the result as _Wrapped, which mypy will not
+    # accept for the declared Callable; the runtime object is compatible.
+    return cast(Callable[Concatenate["Printer", P], R], wrapper)
+
+
 class Printer:
     _job_states = {
         3: "pending",
@@ -31,51 +127,146 @@ class Printer:
     def __init__(
         self,
         preferred_printer: str | None = None,
+        printer_class: str | None = None,
     ) -> None:
         self._conn = cups.Connection()
         self._context = pyudev.Context()
+        # Serializes use of the shared CUPS connection and the enumeration
+        # caches: the threaded HTTP server runs health checks concurrently
+        # with the consumer's print jobs, and pycups connections are not
+        # thread-safe. Held per IPP call, never across a wait loop's
+        # sleeps, so enumeration stays responsive during a job.
+        # Re-entrant because locked methods call each other.
+        self._lock = threading.RLock()
         self._preferred_printer = preferred_printer
+        # Name of a CUPS class (lpadmin -p name -c printer ...) that
+        # aggregates the candidate printers; when set, cupsd handles
+        # routing and failover in a single submission.
+        self._printer_class = printer_class
+
+        self._printers_cache: list[str] | None = None
+        self._printers_cache_ts = 0.0
+        # Printer names are stable, so the name -> USB ID mapping is only
+        # rebuilt when the set of configured CUPS printers changes.
+        self._usb_id_by_name: dict[str, str] = {}
+        self._usb_id_sig: frozenset[str] | None = None
+        # Runs the sysfs scan concurrently with the CUPS query.
+        self._scan_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="usb-scan"
+        )
+        self._label_size_cache: dict[tuple[str, int], tuple[int, int]] = {}
+        self._monitor: pyudev.Monitor | None = None
+        try:
+            monitor = pyudev.Monitor.from_netlink(self._context)
+            # Whole devices only; each plug event otherwise also fires
+            # once per interface.
+            monitor.filter_by("usb", "usb_device")
+            monitor.start()
+        except Exception as e:
+            logger.warning(f"USB monitor unavailable, using TTL-only cache: {e}")
+        else:
+            self._monitor = monitor
 
     def get_available_printers(self) -> list[str]:
         """
         Returns a list of printer names that are both configured in CUPS and
         physically connected via USB.
 
+        Enumerating CUPS and the USB bus is expensive, so results are cached
+        and reused until either a USB device is added or removed (reported by
+        a udev monitor) or the cache outlives ``_CACHE_TTL`` seconds.
+
         Printer names must end with ``_VVVV:PPPP`` where VVVV and PPPP are
         the hexadecimal USB vendor and product IDs (e.g.
         ``iDPRT_SP310_0a5f:0001``).
         """
+        with self._lock:
+            if self._printers_cache is not None and not self._cache_stale():
+                return self._printers_cache
+
+            self._printers_cache = self._enumerate_printers()
+            self._printers_cache_ts = time.monotonic()
+            return self._printers_cache
+
+    def _cache_stale(self) -> bool:
+        if time.monotonic() - self._printers_cache_ts > _CACHE_TTL:
+            return True
+        return self._usb_bus_changed()
+
+    def _usb_bus_changed(self) -> bool:
+        """Drain pending udev events; report whether any arrived."""
+        if self._monitor is None:
+            return False
+        changed = False
+        while self._monitor.poll(timeout=0) is not None:
+            changed = True
+        return changed
+
+    def _reconnect(self) -> None:
+        with self._lock:
+            self._conn = cups.Connection()
+
+    @_with_reconnect
+    def _get_cups_printers(self) -> dict[str, Any]:
+        return dict(self._conn.getPrinters())
+
+    @_with_reconnect
+    def _get_printer_attributes(self, printer_name: str) -> dict[str, Any]:
+        return dict(self._conn.getPrinterAttributes(printer_name))
+
+    @_with_reconnect
+    def _fetch_ppd(self, printer_name: str) -> str:
+        return str(self._conn.getPPD(printer_name))
+
+    def _enumerate_printers(self) -> list[str]:
+        if self._preferred_printer:
+            return self._enumerate_preferred(self._preferred_printer)
+
+        # The CUPS round-trip and the sysfs walk are independent and both
+        # I/O-bound; overlap them instead of running them back to back.
+        # The scan only needs to confirm the IDs the known printers carry.
+        wanted = frozenset(self._usb_id_by_name.values()) or None
+        usb_scan = self._scan_pool.submit(_connected_usb_ids, wanted)
         try:
-            cups_printers = list(self._conn.getPrinters().keys())
+            cups_printers = list(self._get_cups_printers().keys())
         except cups.IPPError as e:
             logger.error(f"Failed to get printers from CUPS: {e}")
+            usb_scan.result()
             return []
 
-        if self._preferred_printer:
-            if self._preferred_printer in cups_printers:
-                return [self._preferred_printer]
-            logger.warning(
-                f"Preferred printer '{self._preferred_printer}' not found in CUPS."
-            )
+        sig = frozenset(cups_printers)
+        if sig != self._usb_id_sig:
+            self._usb_id_by_name = {
+                name: usb_id
+                for name in cups_printers
+                if (usb_id := _usb_id_from_name(name)) is not None
+            }
+            self._usb_id_sig = sig
+
+            # The printer set changed; a scan narrowed to the old IDs may
+            # have stopped before seeing the new ones, so redo it in full.
+            new_wanted = frozenset(self._usb_id_by_name.values())
+            if wanted is not None and not new_wanted <= wanted:
+                usb_scan.result()
+                usb_scan = self._scan_pool.submit(_connected_usb_ids, new_wanted)
+
+        connected_ids = usb_scan.result()
+
+        return [
+            name
+            for name, usb_id in self._usb_id_by_name.items()
+            if usb_id in connected_ids
+        ]
+
+    def _enumerate_preferred(self, preferred: str) -> list[str]:
+        # Query the one printer by name instead of fetching every
+        # configured printer's full attribute set just to test membership.
+        try:
+            self._get_printer_attributes(preferred)
+        except cups.IPPError:
+            logger.warning(f"Preferred printer '{preferred}' not found in CUPS.")
             return []
-
-        connected_ids: set[str] = set()
-        for dev in self._context.list_devices(subsystem="usb"):
-            vid = dev.attributes.get("idVendor")
-            pid = dev.attributes.get("idProduct")
-            if vid and pid:
-                vid_s = vid.decode() if isinstance(vid, bytes) else vid
-                pid_s = pid.decode() if isinstance(pid, bytes) else pid
-                connected_ids.add(f"{vid_s}:{pid_s}".lower())
-
-        def is_connected(name: str) -> bool:
-            match = re.search(r"_([0-9a-fA-F]{4}:[0-9a-fA-F]{4})$", name)
-            if not match:
-                logger.debug(f"Printer '{name}' has no USB ID suffix")
-                return False
-            return match.group(1).lower() in connected_ids
-
-        return [p for p in cups_printers if is_connected(p)]
+        return [preferred]
 
     def get_label_size(self, printer_name: str, dpi: int = 300) -> tuple[int, int]:
         """Get label size in pixels for a printer's default media.
@@ -83,9 +274,17 @@ class Printer:
         Reads the default PageSize from the printer's PPD file.
         Returns (width, height) in pixels at the given DPI, as reported by
         the PPD (no orientation swap).
+
+        PPDs rarely change, so results are cached per (printer, dpi) for
+        the lifetime of the instance; the first call per printer pays the
+        PPD download/parse/unlink, subsequent calls are dict lookups.
         """
+        cache_key = (printer_name, dpi)
+        if cache_key in self._label_size_cache:
+            return self._label_size_cache[cache_key]
+
         try:
-            ppd_file = self._conn.getPPD(printer_name)
+            ppd_file = self._fetch_ppd(printer_name)
         except cups.IPPError as e:
             logger.error(f"Failed to get PPD for {printer_name}: {e}")
             raise PrintFailedError(f"Cannot get PPD: {e}") from e
@@ -103,12 +302,12 @@ class Printer:
 
         # PPD PageSize choices use "wNNhNN" format (points) or
         # "Custom.WxHin" / "Custom.WxHmm" for custom sizes.
-        match = re.match(r"w(\d+)h(\d+)", choice)
+        match = _PPD_WH_RE.match(choice)
         if match:
             w_pt = float(match.group(1))
             h_pt = float(match.group(2))
         else:
-            custom = re.match(r"Custom\.(\d+\.?\d*)x(\d+\.?\d*)(in|mm|cm)?", choice)
+            custom = _PPD_CUSTOM_RE.match(choice)
             if not custom:
                 raise PrintFailedError(
                     f"Cannot parse PageSize from PPD choice: {choice}"
@@ -133,6 +332,7 @@ class Printer:
         h_px = int(h_pt / 72 * dpi)
 
         logger.info(f"Label size for {printer_name}: {choice} -> {w_px}x{h_px}px")
+        self._label_size_cache[cache_key] = (w_px, h_px)
         return w_px, h_px
 
     def _try_print_file_on_printer(
@@ -143,50 +343,159 @@ class Printer:
         timeout: float = 60.0,
     ) -> None:
         logger.info(f"Attempting to print file {name} on printer {printer}")
+
+        def submit() -> int:
+            return int(self._conn.printFile(printer, name, name, dict()))
+
+        self._run_job(submit, printer, poll_period, timeout)
+
+    def _try_print_data_on_printer(
+        self,
+        data: bytes,
+        title: str,
+        printer: str,
+        poll_period: float = 0.25,
+        timeout: float = 60.0,
+    ) -> None:
+        logger.info(
+            f"Attempting to print job {title} ({len(data)} bytes) on printer {printer}"
+        )
+
+        def submit() -> int:
+            job_id = int(self._conn.createJob(printer, title, dict()))
+            self._conn.startDocument(printer, job_id, title, "image/png", 1)
+            self._conn.writeRequestData(data, len(data))
+            self._conn.finishDocument(printer)
+            return job_id
+
+        self._run_job(submit, printer, poll_period, timeout)
+
+    def _run_job(
+        self,
+        submit: Callable[[], int],
+        printer: str,
+        poll_period: float,
+        timeout: float,
+    ) -> None:
+        # Subscribe before submitting so no state change can be missed.
+        # Not all CUPS configurations allow subscriptions; fall back to
+        # polling job attributes in that case.
+        sub_id: int | None = None
         try:
-            job_id = self._conn.printFile(printer, name, name, dict())
-            logger.info(f"Job submitted: ID {job_id}")
+            with self._lock:
+                sub_id = self._conn.createSubscription(
+                    "/", events=["job-completed", "job-state-changed"]
+                )
         except cups.IPPError as e:
-            logger.error(f"IPPError submitting job to {printer}: {e}")
-            raise PrintFailedError from e
+            logger.debug(f"CUPS subscriptions unavailable, will poll: {e}")
 
-        def get_job_state(id_: int) -> str:
+        try:
             try:
-                attrs = self._conn.getJobAttributes(id_)
-                job_state_enum = attrs["job-state"]
-                return Printer._job_states.get(job_state_enum, "unknown")
-            except cups.IPPError:
-                return "unknown"
-
-        def job_is_pending(id_: int) -> bool:
-            return get_job_state(id_) in {"pending", "processing"}
+                with self._lock:
+                    try:
+                        job_id = submit()
+                    except cups.IPPError:
+                        # One retry on a fresh connection in case cupsd
+                        # restarted.
+                        self._reconnect()
+                        job_id = submit()
+                logger.info(f"Job submitted: ID {job_id}")
+            except cups.IPPError as e:
+                logger.error(f"IPPError submitting job to {printer}: {e}")
+                raise PrintFailedError from e
+
+            if sub_id is not None:
+                self._wait_for_job_events(sub_id, job_id, poll_period, timeout)
+            else:
+                self._poll_job(job_id, poll_period, timeout)
+        finally:
+            if sub_id is not None:
+                try:
+                    with self._lock:
+                        self._conn.cancelSubscription(sub_id)
+                except cups.IPPError:
+                    logger.debug(f"Failed to cancel subscription {sub_id}")
+
+        if self._get_job_state(job_id) != "completed":
+            final_state = self._get_job_state(job_id)
+            logger.error(f"Print job {job_id} failed. Final state: {final_state}")
+            raise PrintFailedError
 
-        def job_succeeded(id_: int) -> bool:
-            return get_job_state(id_) == "completed"
+        logger.info(f"Print job {job_id} completed successfully.")
 
+    def _get_job_state(self, job_id: int) -> str:
+        try:
+            with self._lock:
+                attrs = self._conn.getJobAttributes(job_id)
+        except cups.IPPError:
+            return "unknown"
+        return Printer._job_states.get(attrs["job-state"], "unknown")
+
+    def _wait_for_job_events(
+        self, sub_id: int, job_id: int, poll_period: float, timeout: float
+    ) -> None:
+        """Wait on CUPS notifications until the job leaves the pending states."""
         start_time = time.time()
-        while job_is_pending(job_id):
+        delay = _INITIAL_POLL_PERIOD
+        state = self._get_job_state(job_id)
+        while state in {"pending", "processing"}:
             if time.time() - start_time > timeout:
-                logger.error(f"Print job {job_id} on {printer} timed out")
+                logger.error(f"Print job {job_id} timed out")
                 raise PrintFailedError("Job timed out")
-            time.sleep(float(poll_period))
 
-        if not job_succeeded(job_id):
-            final_state = get_job_state(job_id)
-            logger.error(f"Print job {job_id} failed. Final state: {final_state}")
-            raise PrintFailedError
-
-        logger.info(f"Print job {job_id} completed successfully.")
+            try:
+                with self._lock:
+                    events = self._conn.getNotifications([sub_id]).get("events", [])
+            except cups.IPPError:
+                # The subscription likely died with the connection (cupsd
+                # restart); reconnect and poll the job directly instead of
+                # waiting out the timeout on notifications that will never
+                # arrive for a job that may already be done.
+                self._reconnect()
+                remaining = timeout - (time.time() - start_time)
+                self._poll_job(job_id, poll_period, max(remaining, 0.0))
+                return
+
+            for event in events:
+                if event.get("notify-job-id") == job_id and "job-state" in event:
+                    state = Printer._job_states.get(event["job-state"], "unknown")
+
+            # cupsd re-sends the cached subscription events on every pull
+            # (no sequence numbers are passed), so an event that still
+            # shows pending/processing must back off like an empty pull —
+            # otherwise the loop spins IPP requests until the job ends.
+            if state in {"pending", "processing"}:
+                time.sleep(delay)
+                delay = min(delay * _POLL_BACKOFF, float(poll_period))
+
+    def _poll_job(self, job_id: int, poll_period: float, timeout: float) -> None:
+        start_time = time.time()
+        delay = _INITIAL_POLL_PERIOD
+        while self._get_job_state(job_id) in {"pending", "processing"}:
+            if time.time() - start_time > timeout:
+                logger.error(f"Print job {job_id} timed out")
+                raise PrintFailedError("Job timed out")
+            time.sleep(delay)
+            delay = min(delay * _POLL_BACKOFF, float(poll_period))
 
-    def _print_file(self, name: str) -> None:
-        printers = self.get_available_printers()
+    def _print_data(
+        self, data: bytes, title: str, printers: list[str] | None = None
+    ) -> None:
+        if self._printer_class is not None:
+            # One submission; cupsd fails over among the class members,
+            # so a dead first printer no longer costs a full timeout.
+            self._try_print_data_on_printer(data, title, self._printer_class)
+            return
+
+        if printers is None:
+            printers = self.get_available_printers()
         if not printers:
             logger.warning("No available printers found.")
             raise PrintFailedError("No available printers found")
 
         for printer in printers:
             try:
-                self._try_print_file_on_printer(name, printer)
+                self._try_print_data_on_printer(data, title, printer)
             except PrintFailedError:
                 logger.warning(f"Failed to print on {printer}, trying next...")
                 continue
@@ -204,15 +513,39 @@ class Printer:
         if not printers:
             raise PrintFailedError("No available printers found")
 
-        cups_w, cups_h = self.get_label_size(printers[0])
-        render_w = max(cups_w, cups_h)
-        render_h = min(cups_w, cups_h)
-        rendered = render(label, (render_w, render_h))
+        data, title = self._render_label_data(label, printers[0])
+        self._print_data(data, title, printers)
 
-        if cups_w < cups_h:
-            rendered = rendered.transpose(Image.Transpose.ROTATE_90)
+    async def print_label_async(self, label: dict[str, str]) -> None:
+        """Asynchronous variant of :meth:`print_label`.
 
-        with tempfile.NamedTemporaryFile(suffix=".png") as fp:
-            rendered.save(fp, dpi=(300, 300))
-            fp.flush()
-            self._print_file(fp.name)
+        Rendering (CPU) and the CUPS submit/wait (blocking I/O) run on
+        worker threads, so a caller printing a batch of labels can render
+        label N+1 while the job for label N drains.
+        """
+        logger.info(
+            f"Rendering label for package_id: {label.get('package_id', 'unknown')}"
+        )
+        printers = await asyncio.to_thread(self.get_available_printers)
+        if not printers:
+            raise PrintFailedError("No available printers found")
+
+        data, title = await asyncio.to_thread(
+            self._render_label_data, label, printers[0]
+        )
+        await asyncio.to_thread(self._print_data, data, title, printers)
+
+    def _render_label_data(
+        self, label: dict[str, str], printer_name: str
+    ) -> tuple[bytes, str]:
+        """Render the label for the given printer and encode it as PNG."""
+        cups_w, cups_h = self.get_label_size(printer_name)
+        rendered = render(label, (cups_w, cups_h))
+
+        # compress_level=1: the bottleneck is the printer, not the PNG size,
+        # so spend as little CPU as possible on deflate.
+        buf = io.BytesIO()
+        rendered.save(buf, format="PNG", dpi=(300, 300), compress_level=1)
+
+        title = f"label-{label.get('package_id', 'unknown')}"
+        return buf.getvalue(), title
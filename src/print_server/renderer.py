@@ -1,52 +1,48 @@
+import functools
 import importlib.resources
-from typing import Any, TypedDict, cast
 
 import barcode
-from barcode.writer import ImageWriter
 from PIL import Image, ImageDraw, ImageFont
 
-
-class BarcodeOptions(TypedDict):
-    write_text: bool
-    writer: Any
-    dpi: int
-    quiet_zone: int
-    module_width: float
-    module_height: float
+# Maps module-string characters to pixel values: "1" (bar) -> black,
+# "0" (space) -> white.
+_MODULE_LUT = bytes.maketrans(b"01", b"\xff\x00")
 
 
 def code128(s: str, size: tuple[float, float]) -> Image.Image:
-    """Generate a Code128 barcode image."""
-    writer = ImageWriter()
-    # dpi=300 is standard for print
-    # We initialize with a dict but will cast or rely on usage
-    base_options: BarcodeOptions = {
-        "write_text": False,
-        "writer": writer,
-        "dpi": 300,
-        "quiet_zone": 0,
-        "module_width": 0.0,  # Placeholder, set later
-        "module_height": 0.0,  # Placeholder, set later
-    }
-
-    def px2mm(px: float) -> float:
-        dpi = base_options["dpi"]
-        return 25.4 * px / dpi
-
-    # Code128 includes checksum by default
-    code = barcode.Code128(str(s), writer=writer)
-
-    raw = code.build()
-    modules_per_line = len(raw[0])
-    w = px2mm(size[0]) / modules_per_line
-    base_options["module_width"] = w
-
-    h = px2mm(size[1]) - 2  # barcode adds this for some reason
-    base_options["module_height"] = h
-
-    # Cast to Image.Image because barcode.render returns Any
-    # barcode.render expects Dict[str, Any] usually, but TypedDict should pass as Dict
-    return cast(Image.Image, code.render(cast(dict[str, Any], base_options)))
+    """Generate a Code128 barcode image.
+
+    Rasters are memoized on (payload, pixel size): repeat prints reuse the
+    same package and inmate IDs, and the box sizes are fixed per label
+    geometry, so cache hits skip the whole python-barcode pipeline. Callers
+    only paste from the returned image, which leaves the cached copy
+    untouched.
+    """
+    return _code128_cached(str(s), round(size[0]), round(size[1]))
+
+
+@functools.lru_cache(maxsize=512)
+def _code128_cached(s: str, w_px: int, h_px: int) -> Image.Image:
+    # Code128 includes checksum by default. build() already yields the
+    # module string ("1" = bar, "0" = space); expanding it to pixels is
+    # a translate plus a nearest-neighbor resize, both done in C, instead
+    # of python-barcode's per-module rectangle drawing (which also took a
+    # detour through mm/DPI units just to come back to pixels).
+    modules = barcode.Code128(s).build()[0]
+
+    # Snap to a whole number of pixels per module so every bar stays
+    # uniform; the result is at most one module narrower than requested.
+    module_px = max(1, w_px // len(modules))
+    height = max(1, h_px)
+
+    row = Image.frombytes(
+        "L", (len(modules), 1), modules.encode("ascii").translate(_MODULE_LUT)
+    )
+    scaled = row.resize((len(modules) * module_px, height), Image.Resampling.NEAREST)
+    # Hand out bitonal data: the canvas is mode "1", so converting once
+    # here (inside the cache) beats converting on every paste. Dithering
+    # is disabled — the pixels are already pure black and white.
+    return scaled.convert("1", dither=Image.Dither.NONE)
 
 
 def box_size(
@@ -56,40 +52,93 @@ def box_size(
     return x1 - x0, y1 - y0
 
 
-def get_font_cache() -> dict[int, ImageFont.FreeTypeFont]:
-    """Load and cache fonts of varying sizes."""
-    fonts = {}
-    ref = importlib.resources.files(__package__) / "DejaVuSansMono.ttf"
-    with importlib.resources.as_file(ref) as path:
-        # Load all fonts while the file path is guaranteed to be valid
-        for font_size in range(1, 100):
-            fonts[font_size] = ImageFont.truetype(str(path), font_size)
+# Resolve the bundled TTF once; the package is always installed from
+# source, so the materialized path stays valid for the process lifetime.
+with importlib.resources.as_file(
+    importlib.resources.files(__package__) / "DejaVuSansMono.ttf"
+) as _font_path:
+    _FONT_PATH = str(_font_path)
+
+
+@functools.lru_cache(maxsize=128)
+def _get_font(size: int) -> ImageFont.FreeTypeFont:
+    """Load (and cache) the label font at the given size."""
+    return ImageFont.truetype(_FONT_PATH, size)
+
+
+# Reference size used to derive per-point metrics of the monospaced font.
+_REFERENCE_SIZE = 50
+
 
-    return fonts
+@functools.lru_cache(maxsize=4096)
+def _text_bbox(font_size: int, text: str) -> tuple[int, int, int, int]:
+    """Cache FreeType shaping: batch prints repeat the same label strings."""
+    bbox = _get_font(font_size).getbbox(text)
+    return int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])
 
 
-# Initialize font cache
-_FONTS = get_font_cache()
+@functools.lru_cache(maxsize=1024)
+def _text_bitmap(font_size: int, text: str) -> Image.Image:
+    """Pre-rendered bitmap for a string; FreeType runs only on cache misses.
+
+    Labels draw from a small pool of repeating strings (names, units,
+    IDs), so batch prints blit cached bitmaps instead of re-rasterizing
+    glyphs every time.
+    """
+    bbox = _text_bbox(font_size, text)
+    width = max(bbox[2] - bbox[0], 1)
+    height = max(bbox[3] - bbox[1], 1)
+
+    bitmap = Image.new("1", (width, height), color=1)
+    draw = ImageDraw.Draw(bitmap)
+    # Aliased glyphs: anti-aliasing is wasted work for a thresholding
+    # thermal printer. Implied by the mode-"1" bitmap, but stated so it
+    # survives a mode change.
+    draw.fontmode = "1"
+    draw.text((-bbox[0], -bbox[1]), text, font=_get_font(font_size), fill=0)
+    return bitmap
+
+
+@functools.lru_cache(maxsize=1)
+def _metrics_per_point() -> tuple[float, float]:
+    """Advance width and line height of the font, per point of font size."""
+    font = _get_font(_REFERENCE_SIZE)
+    advance = font.getlength("M") / _REFERENCE_SIZE
+    ascent, descent = font.getmetrics()
+    return advance, (ascent + descent) / _REFERENCE_SIZE
 
 
 def fit_font(size: tuple[float, float], text: str) -> ImageFont.FreeTypeFont:
+    """Pick the largest font size whose rendered text fits inside ``size``.
+
+    DejaVuSansMono is monospaced, so text width and height scale linearly
+    with font size; compute the size directly from per-point metrics and
+    correct for rounding with a short verification loop instead of binary
+    searching with a ``getbbox`` call per step.
+    """
     size_w, size_h = size
 
-    min_, max_ = 1, 100
-    while abs(max_ - min_) > 1:
-        font_size = int(round((max_ - min_) / 2)) + min_
+    advance, line_height = _metrics_per_point()
+    chars = max(len(text), 1)
+    by_width = int(size_w / (advance * chars))
+    by_height = int(size_h / line_height)
+    font_size = max(1, min(by_width, by_height, 99))
 
-        font = _FONTS[font_size]
-        bbox = font.getbbox(text)
-        text_w = bbox[2] - bbox[0]
-        text_h = bbox[3] - bbox[1]
+    def fits(sz: int) -> bool:
+        bbox = _text_bbox(sz, text)
+        return bbox[2] - bbox[0] < size_w and bbox[3] - bbox[1] < size_h
 
-        if text_h < size_h and text_w < size_w:
-            min_ = font_size
-        else:
-            max_ = font_size
+    # The estimate brackets the answer but is not exact in either
+    # direction: hinting and bearings can push the true bounding box past
+    # it, while the tight bbox of caps and digits sits well inside the
+    # ascent+descent line height. Walk down until the text fits, then up
+    # while the next size still fits.
+    while font_size > 1 and not fits(font_size):
+        font_size -= 1
+    while font_size < 99 and fits(font_size + 1):
+        font_size += 1
 
-    return _FONTS[min_]
+    return _get_font(font_size)
 
 
 def round_box(
@@ -101,7 +150,7 @@ def round_box(
 
 
 def fit_text(
-    draw: ImageDraw.ImageDraw,
+    image: Image.Image,
     box: tuple[tuple[float, float], tuple[float, float]],
     text: str,
 ) -> None:
@@ -110,16 +159,19 @@ def fit_text(
     size = box_size(box)
 
     font = fit_font(size, text)
+    font_size = int(font.size)
 
-    bbox = font.getbbox(text)
+    bbox = _text_bbox(font_size, text)
     text_w = bbox[2] - bbox[0]
     text_h = bbox[3] - bbox[1]
 
+    # The cached bitmap already bakes in the bbox offsets, so the paste
+    # position is simply the centered top-left corner.
     w, h = size
-    x = lhs[0] + round((w - text_w) / 2) - bbox[0]
-    y = lhs[1] + round((h - text_h) / 2) - bbox[1]
+    x = lhs[0] + round((w - text_w) / 2)
+    y = lhs[1] + round((h - text_h) / 2)
 
-    draw.text((x, y), text, font=font)
+    image.paste(_text_bitmap(font_size, text), (x, y))
 
 
 def add_barcode(
@@ -130,33 +182,72 @@ def add_barcode(
     lhs, rhs = round_box(box)
     # The image paste expects (int, int), lhs is (int, int) from round_box
     size = float(rhs[0] - lhs[0]), float(rhs[1] - lhs[1])
-    bc_img = code128(label, size)
-    image.paste(bc_img, lhs)
+    image.paste(code128(label, size), lhs)
+
+
+_Box = tuple[tuple[float, float], tuple[float, float]]
+
+
+@functools.lru_cache(maxsize=8)
+def _layout(w: float, h: float) -> tuple[_Box, _Box, _Box, _Box]:
+    """Layout boxes for a canvas size, computed once per size.
+
+    Returns the package-ID barcode, package-ID text, inmate name/ID, and
+    jurisdiction/unit/shipping boxes, in drawing order.
+    """
+    return (
+        ((0.05 * w, 0.05 * h), (0.95 * w, 0.38 * h)),
+        ((0.05 * w, 0.38 * h), (0.95 * w, 0.48 * h)),
+        ((0.05 * w, 0.50 * h), (0.95 * w, 0.75 * h)),
+        ((0.05 * w, 0.77 * h), (0.95 * w, 0.95 * h)),
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _label_template(w: int, h: int) -> Image.Image:
+    """Static per-size template that each render starts from.
+
+    Every text box on this layout contains job-specific content, so the
+    template is just the white canvas — but caching it still spares the
+    allocation and zero-fill of a fresh image per label. The target is a
+    1-bit thermal printer; staying bitonal end-to-end moves an eighth of
+    the pixel bytes that "L" grayscale did.
+    """
+    return Image.new("1", (w, h), color=1)
 
 
 def render(label: dict[str, str], size: tuple[int, int] = (1050, 420)) -> Image.Image:
-    w, h = float(size[0]), float(size[1])
-    image = Image.new("L", (int(w), int(h)), color=(255,))
-    draw = ImageDraw.Draw(image)
+    """Render a label at the given target size.
+
+    The layout itself is landscape-only, so a portrait target is composed
+    on the long axis and rotated into place at the end.
+    """
+    portrait = size[0] < size[1]
+    if portrait:
+        w, h = float(size[1]), float(size[0])
+    else:
+        w, h = float(size[0]), float(size[1])
+    image = _label_template(int(w), int(h)).copy()
+
+    barcode_box, package_box, inmate_box, details_box = _layout(w, h)
 
     # package ID barcode (full width)
-    box = (0.05 * w, 0.05 * h), (0.95 * w, 0.38 * h)
-    add_barcode(image, label["package_id"], box)
+    add_barcode(image, label["package_id"], barcode_box)
 
-    box = (0.05 * w, 0.38 * h), (0.95 * w, 0.48 * h)
-    fit_text(draw, box, f"PACKAGE ID: {label['package_id']}".upper())
+    fit_text(image, package_box, f"PACKAGE ID: {label['package_id']}".upper())
 
     # inmate name and ID
-    box = (0.05 * w, 0.50 * h), (0.95 * w, 0.75 * h)
-    fit_text(draw, box, f"{label['inmate_name']} #{label['inmate_id']}".upper())
+    fit_text(image, inmate_box, f"{label['inmate_name']} #{label['inmate_id']}".upper())
 
     # jurisdiction, unit, shipping
-    box = (0.05 * w, 0.77 * h), (0.95 * w, 0.95 * h)
     details = (
         f"{label['inmate_jurisdiction']} \u2014 "
         f"{label['unit_name']} \u2014 "
         f"{label['unit_shipping_method']}"
     ).upper()
-    fit_text(draw, box, details)
+    fit_text(image, details_box, details)
+
+    if portrait:
+        image = image.transpose(Image.Transpose.ROTATE_90)
 
     return image
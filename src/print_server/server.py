@@ -2,15 +2,35 @@ import http.server
 import json
 import logging
 import threading
-from queue import Queue
+from queue import Empty, SimpleQueue
 from typing import Any
-from urllib.parse import parse_qs
+from urllib.parse import parse_qs, unquote_to_bytes
 
 # Import Printer for type hinting
 from .printer import Printer
 
 logger = logging.getLogger(__name__)
 
+# orjson parses and serializes several times faster than stdlib json and
+# works on bytes directly; it is optional because it ships compiled wheels
+# that may not exist for every board this server runs on.
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        # bytes() is a no-op copy-wise here; it pins the return type for
+        # mypy in environments where orjson (an optional extra) is absent.
+        return bytes(orjson.dumps(obj))
+
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+
 REQUIRED_KEYS = {
     "package_id",
     "inmate_id",
@@ -19,10 +39,27 @@ REQUIRED_KEYS = {
     "unit_name",
     "unit_shipping_method",
 }
-STRING_KEYS = REQUIRED_KEYS - {"package_id"}
 MAX_FIELD_LENGTH = 10000
 MAX_PAYLOAD_SIZE = 1024 * 1024  # 1MB
 
+# Sentinel distinguishing absent keys from falsy values in one dict probe.
+_MISSING = object()
+
+_QUEUED_BODY = b'{"status": "queued"}'
+
+# Browsers send an OPTIONS preflight before every cross-origin POST and
+# the reply never varies, so the whole response is prebuilt and written
+# in one call. No Connection header: under HTTP/1.1 its absence means
+# keep-alive, matching the handler's protocol_version.
+_PREFLIGHT_RESPONSE = (
+    b"HTTP/1.1 200 ok\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Access-Control-Allow-Methods: POST, GET, OPTIONS\r\n"
+    b"Access-Control-Allow-Headers: Content-Type\r\n"
+    b"Content-Length: 0\r\n"
+    b"\r\n"
+)
+
 
 class PayloadTooLargeError(Exception):
     """Raised when the payload exceeds the maximum allowed size."""
@@ -30,149 +67,264 @@ class PayloadTooLargeError(Exception):
     pass
 
 
+class _ThreadingHTTPServer(http.server.ThreadingHTTPServer):
+    """Handles requests concurrently so a slow client cannot block others.
+
+    Concurrency is bounded: a burst of slow clients occupies at most
+    ``max_workers`` threads, and further connections wait in the listen
+    backlog until a worker frees up.
+    """
+
+    # Don't let in-flight handler threads hold up shutdown.
+    daemon_threads = True
+
+    max_workers = 16
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._worker_slots = threading.BoundedSemaphore(self.max_workers)
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self._worker_slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            # The handler thread never started, so it cannot release.
+            self._worker_slots.release()
+            raise
+
+    def process_request_thread(self, request: Any, client_address: Any) -> None:
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._worker_slots.release()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Label-submission request handler.
+
+    Defined once at module scope rather than rebuilt as a closure class
+    per ``LabelServer``; each server binds its own queue and printer via
+    :meth:`bind`, which returns a private subclass so two servers in one
+    process never share state.
+    """
+
+    # HTTP/1.1 keeps connections open between requests, so a browser's
+    # preflight + POST pair (and bursts of label submissions) reuse one
+    # TCP connection instead of paying a handshake each. Requires every
+    # response to carry a Content-Length, which all paths below do
+    # (send_error handles its own).
+    protocol_version = "HTTP/1.1"
+
+    # Idle keep-alive connections must not park a worker thread forever:
+    # with the server's bounded worker pool, 16 idle browsers would
+    # otherwise freeze the whole server. On timeout handle_one_request
+    # sets close_connection, releasing the slot.
+    timeout = 30
+
+    # Set on the subclass returned by bind().
+    _queue: SimpleQueue[dict[str, Any] | None]
+    _printer: Printer
+
+    @classmethod
+    def bind(
+        cls, queue: "SimpleQueue[dict[str, Any] | None]", printer: Printer
+    ) -> type["_Handler"]:
+        """Return a subclass wired to one server's queue and printer."""
+        return type(cls.__name__, (cls,), {"_queue": queue, "_printer": printer})
+
+    def do_OPTIONS(self) -> None:  # noqa: N802
+        self.wfile.write(_PREFLIGHT_RESPONSE)
+
+    def _get_post_data(self) -> bytes:
+        try:
+            content_length = int(self.headers["Content-Length"])
+        except (ValueError, KeyError) as e:
+            logger.error("Invalid Content-Length: %s", e)
+            raise ValueError("Invalid Content-Length header") from e
+
+        if content_length < 0:
+            raise ValueError("Negative Content-Length")
+
+        if content_length > MAX_PAYLOAD_SIZE:
+            raise PayloadTooLargeError(f"Payload too large: {content_length} bytes")
+
+        # Stay in bytes: json.loads and parse_qs both accept them,
+        # so a full-body UTF-8 decode/re-encode cycle is avoided.
+        return self.rfile.read(content_length)
+
+    def _send_cors_headers(self) -> None:
+        self.send_header("Access-Control-Allow-Origin", "*")
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path == "/health":
+            # Get printer status using shared printer instance
+            try:
+                printers = self._printer.get_available_printers()
+                status = {
+                    "status": "ok",
+                    "service": "print-server",
+                    "printers": {
+                        "count": len(printers),
+                        "names": printers,
+                    },
+                }
+            except Exception as e:
+                logger.error("Health check failed to get printers: %s", e)
+                status = {
+                    "status": "degraded",
+                    "service": "print-server",
+                    "error": str(e),
+                }
+
+            # Serialize before the status line so the response
+            # carries a Content-Length; clients then know where
+            # the body ends without waiting for a close.
+            body = _json_dumps(status)
+
+            self.send_response(200)
+            self.send_header("Content-type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self._send_cors_headers()
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+    def do_POST(self) -> None:  # noqa: N802
+        try:
+            try:
+                body = self._get_post_data()
+            except PayloadTooLargeError as e:
+                self.send_error(413, str(e))
+                return
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+
+            # JSON bodies skip the form decode entirely; the
+            # form-encoded 'data' field remains for old clients.
+            content_type = self.headers.get("Content-Type", "")
+            if content_type.startswith("application/json"):
+                payload = body
+            elif body.startswith(b"data="):
+                # The usual body is a single 'data=<json>' pair;
+                # slice and percent-decode just that value instead
+                # of having parse_qs split, decode, and dict up
+                # the whole body.
+                raw = body[5:].split(b"&", 1)[0]
+                payload = unquote_to_bytes(raw.replace(b"+", b" "))
+            else:
+                query = parse_qs(body, keep_blank_values=True)
+
+                if b"data" not in query:
+                    logger.warning("POST request missing 'data' field")
+                    self.send_error(400, "Missing 'data' field")
+                    return
+
+                payload = query[b"data"][0]
+
+            try:
+                data = _json_loads(payload)
+            except ValueError as e:
+                # Covers both json.JSONDecodeError and
+                # orjson.JSONDecodeError.
+                logger.error("JSON decode error: %s", e)
+                self.send_error(400, "Invalid JSON")
+                return
+
+            if not isinstance(data, dict):
+                self.send_error(400, "Payload must be a JSON object")
+                return
+
+            # Validate all fields in a single pass over the
+            # required keys; missing keys are still reported
+            # together so clients see every omission at once.
+            missing_keys: list[str] = []
+            field_error: str | None = None
+            for key in REQUIRED_KEYS:
+                val = data.get(key, _MISSING)
+                if val is _MISSING:
+                    missing_keys.append(key)
+                elif key == "package_id":
+                    if not isinstance(val, int):
+                        field_error = "Field 'package_id' must be an integer"
+                elif not isinstance(val, str):
+                    field_error = f"Field '{key}' must be a string"
+                elif len(val) > MAX_FIELD_LENGTH:
+                    field_error = f"Field '{key}' is too long"
+
+            if missing_keys:
+                missing_list = ", ".join(sorted(missing_keys))
+                msg = f"Missing required keys: {missing_list}"
+                logger.warning(msg)
+                self.send_error(400, msg)
+                return
+
+            if field_error is not None:
+                self.send_error(400, field_error)
+                return
+
+            data["package_id"] = str(data["package_id"])
+
+            logger.debug("Received print job via POST")
+            self._queue.put(data)
+
+            self.send_response(200)
+            self.send_header("Content-type", "application/json")
+            self.send_header("Content-Length", str(len(_QUEUED_BODY)))
+            self._send_cors_headers()
+            self.end_headers()
+            self.wfile.write(_QUEUED_BODY)
+        except Exception:
+            logger.exception("Unexpected error in do_POST")
+            self.send_error(500)
+
+
 class LabelServer:
     def __init__(self, address: tuple[str, int], printer: Printer) -> None:
         self._address = address
         self._printer = printer
-        self._queue: Queue[dict[str, Any]] = Queue()
-        self._httpd = http.server.HTTPServer(address, self._create_handler())
+        # SimpleQueue's C implementation makes put/get cheaper than
+        # queue.Queue (no unbounded-capacity bookkeeping or task-done
+        # conditions), and this handoff needs none of Queue's extras.
+        self._queue: SimpleQueue[dict[str, Any] | None] = SimpleQueue()
+        handler = _Handler.bind(self._queue, self._printer)
+        self._httpd = _ThreadingHTTPServer(address, handler)
         self._thread = threading.Thread(target=self._httpd.serve_forever)
         self._thread.daemon = True
 
-    def _create_handler(self) -> type[http.server.BaseHTTPRequestHandler]:
-        queue = self._queue
-        printer = self._printer
-
-        class Handler(http.server.BaseHTTPRequestHandler):
-            def do_OPTIONS(self) -> None:  # noqa: N802
-                self.send_response(200, "ok")
-                self._send_cors_headers()
-                self.send_header("Access-Control-Allow-Methods", "POST, GET, OPTIONS")
-                self.send_header("Access-Control-Allow-Headers", "Content-Type")
-                self.end_headers()
-
-            def _get_post_data(self) -> str:
-                try:
-                    content_length = int(self.headers["Content-Length"])
-                except (ValueError, KeyError) as e:
-                    logger.error(f"Invalid Content-Length: {e}")
-                    raise ValueError("Invalid Content-Length header") from e
-
-                if content_length < 0:
-                    raise ValueError("Negative Content-Length")
-
-                if content_length > MAX_PAYLOAD_SIZE:
-                    raise PayloadTooLargeError(
-                        f"Payload too large: {content_length} bytes"
-                    )
-
-                return self.rfile.read(content_length).decode("utf-8")
-
-            def _send_cors_headers(self) -> None:
-                self.send_header("Access-Control-Allow-Origin", "*")
-
-            def do_GET(self) -> None:  # noqa: N802
-                if self.path == "/health":
-                    self.send_response(200)
-                    self.send_header("Content-type", "application/json")
-                    self._send_cors_headers()
-                    self.end_headers()
-
-                    # Get printer status using shared printer instance
-                    try:
-                        printers = printer.get_available_printers()
-                        status = {
-                            "status": "ok",
-                            "service": "print-server",
-                            "printers": {
-                                "count": len(printers),
-                                "names": printers,
-                            },
-                        }
-                    except Exception as e:
-                        logger.error(f"Health check failed to get printers: {e}")
-                        status = {
-                            "status": "degraded",
-                            "service": "print-server",
-                            "error": str(e),
-                        }
-
-                    self.wfile.write(json.dumps(status).encode("utf-8"))
-                else:
-                    self.send_error(404)
-
-            def do_POST(self) -> None:  # noqa: N802
-                try:
-                    try:
-                        body = self._get_post_data()
-                    except PayloadTooLargeError as e:
-                        self.send_error(413, str(e))
-                        return
-                    except ValueError as e:
-                        self.send_error(400, str(e))
-                        return
-
-                    query = parse_qs(body, keep_blank_values=True)
-
-                    if "data" not in query:
-                        logger.warning("POST request missing 'data' field")
-                        self.send_error(400, "Missing 'data' field")
-                        return
-
-                    try:
-                        data = json.loads(query["data"][0])
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON decode error: {e}")
-                        self.send_error(400, "Invalid JSON")
-                        return
-
-                    if not isinstance(data, dict):
-                        self.send_error(400, "Payload must be a JSON object")
-                        return
-
-                    missing_keys = REQUIRED_KEYS - data.keys()
-                    if missing_keys:
-                        missing_list = ", ".join(sorted(missing_keys))
-                        msg = f"Missing required keys: {missing_list}"
-                        logger.warning(msg)
-                        self.send_error(400, msg)
-                        return
-
-                    if not isinstance(data["package_id"], int):
-                        self.send_error(400, "Field 'package_id' must be an integer")
-                        return
-                    data["package_id"] = str(data["package_id"])
-
-                    for key in STRING_KEYS:
-                        val = data[key]
-                        if not isinstance(val, str):
-                            self.send_error(400, f"Field '{key}' must be a string")
-                            return
-                        if len(val) > MAX_FIELD_LENGTH:
-                            self.send_error(400, f"Field '{key}' is too long")
-                            return
-
-                    logger.info("Received print job via POST")
-                    queue.put(data)
-
-                    self.send_response(200)
-                    self.send_header("Content-type", "application/json")
-                    self._send_cors_headers()
-                    self.end_headers()
-                    self.wfile.write(b'{"status": "queued"}')
-                except Exception:
-                    logger.exception("Unexpected error in do_POST")
-                    self.send_error(500)
-
-        return Handler
-
     def start(self) -> None:
-        logger.info(f"Starting server on {self._address}")
+        logger.info("Starting server on %s", self._address)
         self._thread.start()
 
-    def get_job(self, timeout: float | None = None) -> dict[str, Any]:
+    def get_job(self, timeout: float | None = None) -> dict[str, Any] | None:
+        """Block for the next job; returns ``None`` when woken via ``wake()``."""
         return self._queue.get(timeout=timeout)
 
+    def get_jobs(
+        self, max_batch: int = 8, timeout: float | None = None
+    ) -> list[dict[str, Any] | None]:
+        """Block for one job, then drain up to ``max_batch`` without waiting.
+
+        Jobs that queued up while the consumer was busy printing come
+        back in one call, so the consumer's per-wakeup overhead (printer
+        enumeration, CUPS round trips) is paid once per batch instead of
+        once per label. A ``wake()`` sentinel may appear anywhere in the
+        list.
+        """
+        jobs: list[dict[str, Any] | None] = [self._queue.get(timeout=timeout)]
+        while len(jobs) < max_batch:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except Empty:
+                break
+        return jobs
+
+    def wake(self) -> None:
+        """Unblock a ``get_job()`` caller by enqueueing a sentinel."""
+        self._queue.put(None)
+
     def shutdown(self) -> None:
         logger.info("Shutting down server...")
         self._httpd.shutdown()
@@ -3,6 +3,7 @@ from collections.abc import Generator
 from typing import Any
 from unittest.mock import patch
 
+import cups
 import pytest
 
 from print_server.printer import Printer, PrintFailedError
@@ -11,6 +12,10 @@ from print_server.printer import Printer, PrintFailedError
 @pytest.fixture  # type: ignore[untyped-decorator]
 def mock_cups() -> Generator[Any, None, None]:
     with patch("print_server.printer.cups.Connection") as mock:
+        # Default to the polling fallback; the notification test overrides.
+        mock.return_value.createSubscription.side_effect = cups.IPPError(
+            0, "not supported"
+        )
         yield mock
 
 
@@ -62,3 +67,26 @@ def test_print_success(mock_cups: Any, mock_udev: Any) -> None:
     )
 
     # Should complete without error
+
+
+def test_print_success_via_notifications(mock_cups: Any, mock_udev: Any) -> None:
+    conn_instance = mock_cups.return_value
+    conn_instance.printFile.return_value = 123
+    conn_instance.createSubscription.side_effect = None
+    conn_instance.createSubscription.return_value = 7
+
+    # Initial state check sees "processing", final check sees "completed".
+    conn_instance.getJobAttributes.side_effect = [
+        {"job-state": 5},
+        {"job-state": 9},
+    ]
+    conn_instance.getNotifications.return_value = {
+        "events": [{"notify-job-id": 123, "job-state": 9}]
+    }
+
+    printer = Printer()
+    printer._try_print_file_on_printer(
+        "test_file", "Test_Printer", poll_period=0.01, timeout=1.0
+    )
+
+    conn_instance.cancelSubscription.assert_called_once_with(7)
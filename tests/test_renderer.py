@@ -1,5 +1,3 @@
-from unittest.mock import MagicMock
-
 from PIL import Image, ImageFont
 
 from print_server.renderer import (
@@ -42,23 +40,22 @@ def test_fit_font() -> None:
     assert text_w < size[0]
     assert text_h < size[1]
 
+    # ... and that it is the largest size that fits: one point bigger
+    # must overflow the box in at least one dimension.
+    bigger = font.font_variant(size=int(font.size) + 1)
+    bbox = bigger.getbbox("TEST")
+    assert bbox[2] - bbox[0] >= size[0] or bbox[3] - bbox[1] >= size[1]
+
 
 def test_fit_text() -> None:
-    # Mock ImageDraw
-    draw = MagicMock()
+    image = Image.new("1", (100, 200), color=1)
     box = ((0.0, 0.0), (100.0, 200.0))
     text = "TEST LABEL"
 
-    fit_text(draw, box, text)
+    fit_text(image, box, text)
 
-    # Verify draw.text was called
-    draw.text.assert_called_once()
-    args, kwargs = draw.text.call_args
-    # args[0] is position (x, y)
-    # args[1] is text
-    assert args[1] == text
-    assert "font" in kwargs
-    assert isinstance(kwargs["font"], ImageFont.FreeTypeFont)
+    # Verify text pixels were drawn onto the (previously blank) canvas
+    assert image.histogram()[0] > 0
 
 
 def test_code128() -> None:
@@ -45,6 +45,17 @@ def send_post(base_url: str, data_dict: dict[str, Any]) -> tuple[int, bytes]:
         return e.code, e.read()
 
 
+def send_post_json(base_url: str, data_dict: dict[str, Any]) -> tuple[int, bytes]:
+    body = json.dumps(data_dict).encode("utf-8")
+    req = urllib.request.Request(base_url, data=body, method="POST")
+    req.add_header("Content-Type", "application/json")
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
 def test_valid_post(server: tuple[str, LabelServer]) -> None:
     base_url, _ = server
     payload = {
@@ -60,6 +71,79 @@ def test_valid_post(server: tuple[str, LabelServer]) -> None:
     assert b"queued" in body
 
 
+def test_valid_post_json(server: tuple[str, LabelServer]) -> None:
+    base_url, srv = server
+    payload = {
+        "package_id": 123,
+        "inmate_id": "12345",
+        "inmate_name": "John Doe",
+        "inmate_jurisdiction": "County",
+        "unit_name": "Block A",
+        "unit_shipping_method": "Truck",
+    }
+    status, body = send_post_json(base_url, payload)
+    assert status == 200
+    assert b"queued" in body
+
+    job = srv.get_job(timeout=5)
+    assert job is not None
+    assert job["package_id"] == "123"
+
+
+def test_form_fast_path_decoding(server: tuple[str, LabelServer]) -> None:
+    base_url, srv = server
+    # Values that exercise the hand-rolled 'data=' decode: spaces become
+    # '+', and '&', '+', '%', and non-ASCII are percent-encoded.
+    payload = {
+        "package_id": 123,
+        "inmate_id": "12345",
+        "inmate_name": "José O'Neill & Sons + Co",
+        "inmate_jurisdiction": "County 100%",
+        "unit_name": "Block A",
+        "unit_shipping_method": "Truck",
+    }
+    status, body = send_post(base_url, payload)
+    assert status == 200
+    assert b"queued" in body
+
+    job = srv.get_job(timeout=5)
+    assert job is not None
+    assert job["inmate_name"] == payload["inmate_name"]
+    assert job["inmate_jurisdiction"] == payload["inmate_jurisdiction"]
+
+
+def test_options_preflight(server: tuple[str, LabelServer]) -> None:
+    base_url, _ = server
+    req = urllib.request.Request(base_url, method="OPTIONS")
+    with urllib.request.urlopen(req) as response:
+        assert response.status == 200
+        assert response.headers["Access-Control-Allow-Origin"] == "*"
+        assert response.headers["Access-Control-Allow-Methods"] == "POST, GET, OPTIONS"
+        assert response.headers["Access-Control-Allow-Headers"] == "Content-Type"
+        assert response.headers["Content-Length"] == "0"
+
+
+def test_get_jobs_batch_and_wake(server: tuple[str, LabelServer]) -> None:
+    base_url, srv = server
+    payload = {
+        "package_id": 1,
+        "inmate_id": "12345",
+        "inmate_name": "John Doe",
+        "inmate_jurisdiction": "County",
+        "unit_name": "Block A",
+        "unit_shipping_method": "Truck",
+    }
+    # Both jobs are queued once their 200 responses come back.
+    status, _ = send_post(base_url, payload)
+    assert status == 200
+    status, _ = send_post(base_url, {**payload, "package_id": 2})
+    assert status == 200
+    srv.wake()
+
+    jobs = srv.get_jobs(timeout=5)
+    assert [job and job["package_id"] for job in jobs] == ["1", "2", None]
+
+
 def test_missing_keys(server: tuple[str, LabelServer]) -> None:
     base_url, _ = server
     payload = {